@@ -0,0 +1,198 @@
+"""In-memory task/user store.
+
+Kept free of FastAPI imports and fully annotated so the module can be
+AOT-compiled with mypyc (``mypyc store.py``) for deployments where the
+bytecode dispatch overhead of the dict-glue methods matters; the app
+works identically from the plain interpreted module.
+"""
+
+from collections.abc import ValuesView
+from datetime import datetime, timezone
+from typing import Any, Literal
+import itertools
+import threading
+import time
+
+import msgspec
+
+TaskStatus = Literal["queued", "done", "cancelled"]
+
+# Stored task record. A Struct instance is slot-based — roughly a quarter
+# of the memory of the dict-per-task layout — and the encoder serializes
+# it directly without an intermediate dict.
+class Task(msgspec.Struct):
+    id: int
+    owner_id: int
+    title: str
+    description: str | None
+    status: TaskStatus
+    created_at: datetime
+    updated_at: datetime
+
+_ENC = msgspec.json.Encoder()
+
+# Prebound: fromtimestamp(time(), utc) is cheaper in CPython than
+# datetime.now(tz), and the globals lookups are gone from the hot path.
+_time = time.time
+_fromts = datetime.fromtimestamp
+_UTC = timezone.utc
+
+def now_utc() -> datetime:
+    return _fromts(_time(), _UTC)
+
+_PATCHABLE = ("title", "description", "status")
+_MISSING: Any = object()
+
+class Store:
+    # Reads are lock-free: single dict ops are atomic under the GIL.
+    # Compound write sequences (task dict + owner index + cache drop) take
+    # a lock striped by owner_id, so writers for different owners never
+    # contend with each other — only with themselves.
+    def __init__(self) -> None:
+        self.users: dict[int, dict] ={}
+        self._usernames: set[str] = set()
+        self._tasks: dict[int, Task] = {}
+        self._by_owner: dict[int, dict[int, Task]] = {}
+        self._task_id_gen = itertools.count(1)
+        self._user_id_gen = itertools.count(1)
+        self._write_locks = tuple(threading.Lock() for _ in range(64))
+        self._users_lock = threading.Lock()
+        # Pre-serialized GET /tasks payload; dropped on any task mutation.
+        # Both the drop and the rebuild-and-install go through _cache_lock
+        # so an invalidation can never interleave with a rebuild (which
+        # would re-install a pre-write snapshot and serve it until the
+        # next write). Lock order is always stripe lock -> cache lock.
+        self._list_cache: bytes | None = None
+        self._cache_lock = threading.Lock()
+
+    # Invariant: NEVER block, sleep, or do I/O while holding a write lock.
+    # Prepare everything (timestamps, record construction, validation)
+    # before acquiring; the locked region is dict/slot mutation only. Any
+    # future side effects (audit log, webhooks) go after release.
+    def _lock_for(self, owner_id: int) -> threading.Lock:
+        return self._write_locks[owner_id & 63]
+
+    def _drop_list_cache(self) -> None:
+        with self._cache_lock:
+            self._list_cache = None
+
+    def create_task(self, owner_id: int, title: str, description: str | None) -> Task:
+        if owner_id not in self.users:
+            raise KeyError("owner not found")
+
+        # created_at and updated_at deliberately share one datetime object;
+        # an unpatched task (the steady-state common case) allocates and
+        # formats a single timestamp. patch_task replaces updated_at with a
+        # fresh one only when the task actually changes.
+        now = now_utc()
+
+        task = Task(
+            id=next(self._task_id_gen),
+            owner_id=owner_id,
+            title=title,
+            description=description,
+            status="queued",
+            created_at=now,
+            updated_at=now,
+        )
+
+        with self._lock_for(owner_id):
+            self._tasks[task.id] = task
+            self._by_owner.setdefault(owner_id, {})[task.id] = task
+            self._drop_list_cache()
+        return task
+
+    def list_tasks(self, owner_id: int | None) -> ValuesView[Task]:
+        # Live view, no O(N) copy; callers materialize only when a
+        # serializer needs a real sequence.
+        if owner_id is not None:
+            return self._by_owner.get(owner_id, {}).values()
+        return self._tasks.values()
+
+    def list_tasks_bytes(self) -> bytes:
+        # Read through a local: another thread may drop the cache between
+        # a check on self._list_cache and a second attribute load.
+        cached = self._list_cache
+        if cached is not None:
+            return cached
+        with self._cache_lock:
+            cached = self._list_cache
+            if cached is None:
+                cached = _ENC.encode(list(self._tasks.values()))
+                self._list_cache = cached
+        return cached
+
+    def get_task(self, task_id: int) -> Task | None:
+        return self._tasks.get(task_id)
+
+    def patch_task(self, task_id: int, patch: dict) -> Task | None:
+        # Miss is signalled with None rather than an exception: raising
+        # allocates a traceback and walks the stack, far more expensive
+        # than the plain return callers turn into a 404.
+        task = self._tasks.get(task_id)
+        if task is None:
+            return None
+
+        now = now_utc()
+        with self._lock_for(task.owner_id):
+            for k in _PATCHABLE:
+                v = patch.get(k, _MISSING)
+                if v is not _MISSING:
+                    setattr(task, k, v)
+
+            task.updated_at = now
+            self._drop_list_cache()
+        return task
+
+    def delete_task(self, task_id: int) -> bool:
+        # pop with a sentinel: one hash lookup instead of a membership
+        # check followed by a second lookup to remove.
+        task = self._tasks.pop(task_id, _MISSING)
+        if task is _MISSING:
+            return False
+        with self._lock_for(task.owner_id):
+            self._by_owner[task.owner_id].pop(task_id, None)
+            self._drop_list_cache()
+        return True
+
+    def bulk_patch(self, items: list[tuple[int, dict]]) -> list[Task]:
+        # One pass, one timestamp shared by the whole batch; unknown ids
+        # are skipped rather than failing the batch.
+        now = now_utc()
+        results: list[Task] = []
+        for task_id, patch in items:
+            task = self._tasks.get(task_id)
+            if task is None:
+                continue
+            with self._lock_for(task.owner_id):
+                for k in _PATCHABLE:
+                    v = patch.get(k, _MISSING)
+                    if v is not _MISSING:
+                        setattr(task, k, v)
+                task.updated_at = now
+            results.append(task)
+        if results:
+            self._drop_list_cache()
+        return results
+
+    def cancel_task(self, task_id: int) -> Task | None:
+        return self.patch_task(task_id, {"status": "cancelled"})
+
+    def create_user(self, username: str) -> dict:
+        # The lock covers only the check-then-add that claims the
+        # username; the id counter is a C-level itertools.count whose
+        # __next__ is GIL-atomic, and the dict insert is a single op.
+        with self._users_lock:
+            if username in self._usernames:
+                raise ValueError("username already exists")
+            self._usernames.add(username)
+        uid = next(self._user_id_gen)
+        user = {"id": uid, "username": username}
+        self.users[uid] = user
+        return user
+
+    def list_users(self) -> ValuesView[dict]:
+        return self.users.values()
+
+    def get_user(self, user_id: int) -> dict | None:
+        return self.users.get(user_id)